@@ -0,0 +1,245 @@
+# backfill.py
+# Rebuild history for model training. Run from project root:
+#   python backfill.py --start 2018-01-01 --end 2024-12-31 --sources noaa usda sentinel
+#
+# Work is split into units (one month for NOAA / Sentinel, one season for USDA),
+# fetched in parallel within each source's rate limit, and checkpointed per unit
+# in backfill_units, so an interrupted backfill resumes without refetching.
+#
+# A checkpoint records the date range actually covered, and only days older
+# than the source's reporting lag count as covered (recent data may not be
+# published yet). A unit cut short by --start/--end, or still inside the lag,
+# is fetched again - only the missing part - on the next run.
+import argparse
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from pipeline.clean_merge import init_db, save_usda, save_weather, save_fields, load_fields_gdf
+from pipeline.finalize import finalize_snapshot
+from pipeline.import_ndvi import INSERT_SQL, to_ndvi_rows
+from pipeline.snapshots import DB_PATH, begin_snapshot, publish_snapshot, release_snapshot
+
+# unit size, parallel workers, max requests/second, and reporting lag (days) per source
+SOURCES = {
+    'noaa': {'unit': 'month', 'workers': 4, 'rate': 4.0, 'lag': 30},      # CDO API allows 5 req/s; GHCND lags weeks
+    'sentinel': {'unit': 'month', 'workers': 2, 'rate': 1.0, 'lag': 5},   # EE getInfo() is heavy
+    'usda': {'unit': 'season', 'workers': 1, 'rate': 0.5, 'lag': 90},     # county yields come out the next spring
+}
+
+
+class RateLimiter:
+    """Thread-safe: at most `rate` calls to wait() per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        time.sleep(max(0.0, at - now))
+
+
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.rows = 0
+        self.t0 = time.monotonic()
+
+    def update(self, source, unit, rows=None, error=None):
+        self.done += 1
+        if error is not None:
+            self.failed += 1
+        else:
+            self.rows += rows
+        elapsed = max(time.monotonic() - self.t0, 1e-9)
+        units_per_s = self.done / elapsed
+        eta = timedelta(seconds=int((self.total - self.done) / units_per_s))
+        status = f"FAILED ({error})" if error is not None else f"{rows:,} rows"
+        print(f"[{self.done}/{self.total}] {source} {unit}: {status} | "
+              f"{self.rows / elapsed:,.0f} rows/s, {units_per_s:.2f} units/s | ETA {eta}")
+
+
+def split_units(source, start, end):
+    """[(unit, unit_start, unit_end)], inclusive dates clipped to [start, end]"""
+    if SOURCES[source]['unit'] == 'season':
+        return [(str(y), max(start, date(y, 1, 1)), min(end, date(y, 12, 31)))
+                for y in range(start.year, end.year + 1)]
+    return [(str(m), max(start, m.start_time.date()), min(end, m.end_time.date()))
+            for m in pd.period_range(start, end, freq='M')]
+
+
+def missing_range(s, e, saved):
+    """Part of [s, e] not covered by the saved (start, end) range; None if covered.
+
+    With the saved range strictly inside [s, e], the whole of [s, e] is fetched.
+    """
+    if saved is None:
+        return s, e
+    a, b = saved
+    if a <= s and e <= b:
+        return None
+    if b < s or e < a:  # no overlap
+        return s, e
+    day = timedelta(days=1)
+    return (s if s < a else b + day), (e if e > b else a - day)
+
+
+def settled_range(source, s, e, saved, today):
+    """Saved range after fetching [s, e] today (None if nothing is settled yet).
+
+    Days within the source's reporting lag are not counted, and the new range
+    is merged with the saved one when they touch.
+    """
+    e = min(e, today - timedelta(days=SOURCES[source]['lag']))
+    if e < s:
+        return saved
+    day = timedelta(days=1)
+    if saved is not None and saved[0] <= e + day and s <= saved[1] + day:
+        return min(saved[0], s), max(saved[1], e)
+    return s, e
+
+
+def _make_fetchers(sources, fields_gdf):
+    """source -> fetch(start, end) returning a DataFrame; raises on failure"""
+    fetchers = {}
+    if 'noaa' in sources:
+        from pipeline.config_CORRECT import load_config
+        from pipeline.ingest_noaa import fetch_noaa_range, resolve_station
+        token = load_config()['data_sources']['noaa']['token']
+        station = resolve_station(token)
+
+        def fetch_noaa(start, end):
+            df = fetch_noaa_range(station, token, start.isoformat(), end.isoformat())
+            if df is None:
+                raise RuntimeError(f"NOAA request failed for {station}")
+            return df
+        fetchers['noaa'] = fetch_noaa
+
+    if 'usda' in sources:
+        from pipeline.ingest_usda import fetch_usda_yield
+        fetchers['usda'] = lambda start, end: fetch_usda_yield(start.year, end.year)
+
+    if 'sentinel' in sources:
+        from pipeline import ingest_sentinel
+        if not ingest_sentinel._ee_ready:
+            raise SystemExit("Sentinel backfill needs Earth Engine credentials (see ingest_sentinel.py)")
+
+        def fetch_sentinel(start, end):
+            # filterDate's end is exclusive
+            return ingest_sentinel.fetch_sentinel_ndvi(
+                fields_gdf, start_date=start, end_date=end + timedelta(days=1))
+        fetchers['sentinel'] = fetch_sentinel
+    return fetchers
+
+
+def _save_ndvi(conn, df):
+    if df.empty:
+        return 0
+    with conn:
+        before = conn.total_changes
+        conn.executemany(INSERT_SQL, to_ndvi_rows(df, {}))
+        return conn.total_changes - before
+
+
+WRITERS = {
+    'noaa': save_weather,
+    'usda': save_usda,
+    'sentinel': _save_ndvi,
+}
+
+
+def _backfill_into(staging, start, end, sources, force):
+    """Fetch and write all pending units into staging. Returns the number that failed."""
+    conn = sqlite3.connect(staging)
+    init_db(conn)
+    fields_gdf = load_fields_gdf()
+    save_fields(conn, fields_gdf)
+
+    saved = {} if force else {
+        (src, unit): (date.fromisoformat(s), date.fromisoformat(e))
+        for src, unit, s, e in conn.execute("SELECT source, unit, start_date, end_date FROM backfill_units")}
+    units = [(src, unit, s, e) for src in sources for unit, s, e in split_units(src, start, end)]
+    todo = []
+    for src, unit, s, e in units:
+        missing = missing_range(s, e, saved.get((src, unit)))
+        if missing:
+            todo.append((src, unit) + missing)
+    print(f"Backfill {start} → {end}: {len(todo)} units to fetch ({len(units) - len(todo)} already done)")
+
+    fetchers = _make_fetchers(sources, fields_gdf)
+    limiters = {src: RateLimiter(SOURCES[src]['rate']) for src in sources}
+    executors = {src: ThreadPoolExecutor(max_workers=SOURCES[src]['workers'], thread_name_prefix=src)
+                 for src in sources}
+
+    def fetch(src, s, e):
+        limiters[src].wait()
+        return fetchers[src](s, e)
+
+    progress = Progress(len(todo))
+    try:
+        futures = {executors[src].submit(fetch, src, s, e): (src, unit, s, e)
+                   for src, unit, s, e in todo}
+        # Fetch in worker threads, write on this thread (one sqlite connection)
+        for fut in as_completed(futures):
+            src, unit, s, e = futures[fut]
+            try:
+                df = fut.result()
+            except Exception as ex:
+                progress.update(src, unit, error=ex)
+                continue
+            rows = WRITERS[src](conn, df)
+            # Only settled days count as done: an empty or partial answer for
+            # recent days (not published yet) is fetched again next run
+            covered = settled_range(src, s, e, saved.get((src, unit)), date.today())
+            # Writes are idempotent, so a crash between these two commits only refetches the unit
+            if covered is not None and covered != saved.get((src, unit)):
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO backfill_units VALUES (?, ?, ?, ?, ?, ?)",
+                                 (src, unit, covered[0].isoformat(), covered[1].isoformat(), rows,
+                                  datetime.now().isoformat(timespec='seconds')))
+            progress.update(src, unit, rows)
+    finally:
+        for ex in executors.values():
+            ex.shutdown(wait=False, cancel_futures=True)
+        conn.close()
+    return progress.failed
+
+
+def run_backfill(start, end, sources, force=False, db_path=DB_PATH):
+    staging = begin_snapshot(db_path, producer="backfill")
+    try:
+        failed = _backfill_into(staging, start, end, sources, force)
+        if failed:
+            print(f"{failed} units failed; run again to retry them")
+        finalize_snapshot(staging)
+        publish_snapshot(staging, db_path)
+    except BaseException:
+        release_snapshot(staging)  # staging is kept; the next backfill resumes it
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical data into the pipeline DB")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument("--force", action="store_true", help="refetch units already checkpointed")
+    args = parser.parse_args()
+    if args.start > args.end:
+        parser.error("--start must be before --end")
+    run_backfill(args.start, args.end, args.sources, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# benchmark.py
+# Run from project root: python benchmark.py memory --rows 10000000
+import argparse
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def _build_ndvi_db(db_path, rows, n_fields=500, batch=500_000):
+    """Synthetic sentinel_ndvi table with `rows` rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS sentinel_ndvi")
+    conn.execute("""CREATE TABLE sentinel_ndvi (
+        field_id TEXT, date DATE, ndvi_mean REAL, ndvi_std REAL, cloud_cover REAL DEFAULT 0)""")
+    rng = np.random.default_rng(42)
+    days = pd.date_range("2015-01-01", "2025-12-31", freq="D").strftime("%Y-%m-%d").to_numpy()
+    fields = np.array([f"F{i}" for i in range(n_fields)])
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        conn.executemany(
+            "INSERT INTO sentinel_ndvi VALUES (?, ?, ?, ?, ?)",
+            zip(fields[rng.integers(0, n_fields, n)].tolist(),
+                days[rng.integers(0, len(days), n)].tolist(),
+                rng.uniform(0.1, 0.9, n).tolist(),
+                rng.uniform(0.0, 0.2, n).tolist(),
+                rng.uniform(0, 20, n).tolist()))
+        conn.commit()
+    conn.close()
+
+
+def _load(mode, db_path):
+    """Load the NDVI table one way and report peak RSS (runs in a child process)"""
+    # Import up front in both modes so the package import cost is the same
+    from pipeline.frames import read_typed, NDVI_DTYPES
+
+    conn = sqlite3.connect(db_path)
+    query = "SELECT field_id, date, ndvi_mean, ndvi_std, cloud_cover FROM sentinel_ndvi"
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        # What load_data / train_yield_model used to do
+        df = pd.read_sql(query, conn)
+        df['date'] = pd.to_datetime(df['date'])
+    else:
+        df = read_typed(conn, query, NDVI_DTYPES)
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    frame_mb = df.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"{mode:<8} rows={len(df):>10,}  frame={frame_mb:8.1f} MB  "
+          f"peak_rss={_peak_rss_mb():8.1f} MB  load={elapsed:6.1f}s")
+
+
+def bench_memory(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"Building {args.rows:,} NDVI rows...")
+        _build_ndvi_db(db_path, args.rows)
+        # Separate processes so each mode gets its own peak RSS
+        for mode in ("legacy", "typed"):
+            subprocess.run([sys.executable, __file__, "_load", mode, db_path], check=True)
+
+
+def _write_ndvi_csv(path, rows, n_fields=500, batch=500_000):
+    """Synthetic vendor export (Earth Engine column names, gzip if path ends in .gz)"""
+    rng = np.random.default_rng(7)
+    days = pd.date_range("2015-01-01", "2025-12-31", freq="D").strftime("%Y-%m-%d").to_numpy()
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        pd.DataFrame({
+            'system:index': np.arange(start, start + n),
+            'date': days[rng.integers(0, len(days), n)],
+            'field_id': np.char.add("F", rng.integers(0, n_fields, n).astype(str)),
+            'mean': rng.uniform(0.1, 0.9, n),
+            'stdDev': rng.uniform(0.0, 0.2, n),
+        }).to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def _import(db_path, csv_path):
+    from pipeline.import_ndvi import import_ndvi_file
+
+    conn = sqlite3.connect(db_path)
+    with open("sql/schema.sql") as f:
+        conn.executescript(f.read())
+    t0 = time.perf_counter()
+    n = import_ndvi_file(conn, csv_path)
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    print(f"import   file={os.path.getsize(csv_path) / 1024 / 1024:8.1f} MB  new_rows={n:>10,}  "
+          f"peak_rss={_peak_rss_mb():8.1f} MB  {n / elapsed:,.0f} rows/s")
+
+
+def bench_import(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_path = os.path.join(tmp, f"import_{rows}.db")
+            csv_path = os.path.join(tmp, f"ndvi_{rows}.csv.gz")
+            print(f"Writing {rows:,} NDVI rows to {os.path.basename(csv_path)}...")
+            _write_ndvi_csv(csv_path, rows)
+            # Peak RSS should not grow with file size
+            subprocess.run([sys.executable, __file__, "_import", db_path, csv_path], check=True)
+
+
+def bench_views(args):
+    from pipeline.dashboard_views import VIEWS_SQL, MAX_POINTS
+    from pipeline.frames import load_ndvi
+
+    field = "F0"
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_path = os.path.join(tmp, f"views_{rows}.db")
+            _build_ndvi_db(db_path, rows)
+            conn = sqlite3.connect(db_path)
+
+            # Old dashboard: whole table, latest + per-field filter in pandas
+            t0 = time.perf_counter()
+            ndvi = load_ndvi(conn)
+            ndvi.sort_values('date').groupby('field_id', observed=True).tail(1)
+            ndvi[ndvi['field_id'] == field]
+            legacy = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            for name in ('mv_latest_ndvi', 'mv_ndvi_series'):
+                conn.execute(f"CREATE TABLE {name} AS {VIEWS_SQL[name]}", {'points': MAX_POINTS})
+            conn.execute("CREATE INDEX idx_mv_ndvi_series_field ON mv_ndvi_series (field_id, date)")
+            conn.commit()
+            build = time.perf_counter() - t0
+
+            # New dashboard: small views, pushed down to the selected field
+            t0 = time.perf_counter()
+            pd.read_sql("SELECT field_id, date, ndvi_mean FROM mv_latest_ndvi", conn)
+            series = pd.read_sql("SELECT date, ndvi_mean FROM mv_ndvi_series WHERE field_id = ?",
+                                 conn, params=(field,))
+            views = time.perf_counter() - t0
+            conn.close()
+            print(f"history={rows:>10,}  legacy_load={legacy:7.3f}s  views_load={views:7.3f}s  "
+                  f"(build {build:6.1f}s in pipeline, {len(series)} chart points)")
+
+
+def _build_forecast_db(db_path, n_fields, n_obs):
+    """n_fields NDVI series with n_obs 5-day observations each, plus daily weather"""
+    conn = sqlite3.connect(db_path)
+    with open("sql/schema.sql") as f:
+        conn.executescript(f.read())
+    rng = np.random.default_rng(3)
+    dates = pd.date_range(end="2025-10-31", periods=n_obs, freq="5D")
+    doy = dates.dayofyear.to_numpy()
+    seasonal = 0.45 + 0.3 * np.sin(2 * np.pi * (doy - 100) / 365.25)
+    day_str = dates.strftime("%Y-%m-%d").tolist()
+    for i in range(n_fields):
+        values = seasonal + rng.normal(0, 0.05, n_obs)
+        conn.executemany("INSERT INTO sentinel_ndvi (field_id, date, ndvi_mean, ndvi_std) VALUES (?, ?, ?, 0.1)",
+                         zip([f"F{i}"] * n_obs, day_str, values.tolist()))
+    days = pd.date_range(dates[0], dates[-1], freq="D")
+    gdd = np.clip(15 * np.sin(2 * np.pi * (days.dayofyear.to_numpy() - 100) / 365.25) + rng.normal(0, 3, len(days)), 0, None)
+    conn.executemany("INSERT INTO weather_daily (date, gdd) VALUES (?, ?)",
+                     zip(days.strftime("%Y-%m-%d").tolist(), gdd.tolist()))
+    conn.commit()
+    conn.close()
+
+
+def bench_forecast(args):
+    from pipeline.forecast import run_forecasts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "forecast.db")
+        _build_forecast_db(db_path, args.fields, args.obs)
+        print(f"{args.fields:,} fields x {args.obs} obs")
+
+        def timed(label, **kw):
+            t0 = time.perf_counter()
+            refit, cached = run_forecasts(db_path, **kw)
+            elapsed = time.perf_counter() - t0
+            print(f"{label:<22} {elapsed:7.2f}s  refit={refit:,} cached={cached:,}")
+
+        timed("cold, 1 process", workers=1)
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM forecast_fits")
+        conn.commit()
+        timed(f"cold, pool of {os.cpu_count()}")
+        timed("warm, nothing changed")
+        # New observation for 1% of fields
+        changed = [f"F{i}" for i in range(0, args.fields, 100)]
+        conn.executemany("INSERT INTO sentinel_ndvi (field_id, date, ndvi_mean, ndvi_std) "
+                         "VALUES (?, '2025-11-05', 0.4, 0.1)", [(f,) for f in changed])
+        conn.commit()
+        conn.close()
+        timed("warm, 1% new obs")
+
+
+def bench_reports(args):
+    from pipeline.dashboard_views import VIEWS_SQL, MAX_POINTS
+    from pipeline.forecast import run_forecasts
+    from pipeline.reports import build_reports
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "reports.db")
+        reports_dir = os.path.join(tmp, "reports")
+        _build_forecast_db(db_path, args.fields, 150)
+        run_forecasts(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO farm_fields VALUES (?, 'corn')", [(f"F{i}",) for i in range(args.fields)])
+        for name, sql in VIEWS_SQL.items():
+            conn.execute(f"CREATE TABLE {name} AS {sql}", {'points': MAX_POINTS})
+        # Benchmarks come from the yield model; constants are enough for rendering
+        conn.execute("""CREATE TABLE mv_benchmarks AS
+                        SELECT field_id, ndvi_mean, 0.7 AS hist_ndvi, ndvi_mean - 0.7 AS ndvi_delta,
+                               180.0 AS yield_pred, 175.0 AS county_avg, 5.0 AS yield_delta
+                        FROM mv_latest_ndvi""")
+        conn.commit()
+        print(f"{args.fields:,} field reports + 1 farm report")
+
+        def timed(label, **kw):
+            t0 = time.perf_counter()
+            rendered, cached = build_reports(db_path, reports_dir, **kw)
+            elapsed = time.perf_counter() - t0
+            print(f"{label:<22} {elapsed:7.2f}s  rendered={rendered:,} cached={cached:,}  "
+                  f"({(rendered + cached) / elapsed:,.0f} reports/s)")
+
+        timed("cold, 1 process", workers=1)
+        for name in os.listdir(reports_dir):
+            os.remove(os.path.join(reports_dir, name))
+        timed(f"cold, pool of {os.cpu_count()}")
+        timed("warm, nothing changed")
+        # New observation for 1% of fields (their reports and the farm summary change)
+        conn.executemany("UPDATE mv_latest_ndvi SET ndvi_mean = 0.4 WHERE field_id = ?",
+                         [(f"F{i}",) for i in range(0, args.fields, 100)])
+        conn.commit()
+        conn.close()
+        timed("warm, 1% changed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Farm pipeline benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("memory", help="Peak RSS loading NDVI: default dtypes vs typed loader")
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.set_defaults(func=bench_memory)
+
+    p = sub.add_parser("import", help="Streaming NDVI CSV import: peak RSS across file sizes")
+    p.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    p.set_defaults(func=bench_import)
+
+    p = sub.add_parser("views", help="Dashboard data load: raw history vs precomputed views")
+    p.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    p.set_defaults(func=bench_views)
+
+    p = sub.add_parser("forecast", help="Per-field forecasting: cold vs cached runtime")
+    p.add_argument("--fields", type=int, default=1000)
+    p.add_argument("--obs", type=int, default=150)
+    p.set_defaults(func=bench_forecast)
+
+    p = sub.add_parser("reports", help="Weekly PDF reports: render throughput, cold vs cached")
+    p.add_argument("--fields", type=int, default=300)
+    p.set_defaults(func=bench_reports)
+
+    p = sub.add_parser("_load")
+    p.add_argument("mode")
+    p.add_argument("db_path")
+    p.set_defaults(func=lambda a: _load(a.mode, a.db_path))
+
+    p = sub.add_parser("_import")
+    p.add_argument("db_path")
+    p.add_argument("csv_path")
+    p.set_defaults(func=lambda a: _import(a.db_path, a.csv_path))
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,95 +2,121 @@ import sqlite3
 import pandas as pd
 import geopandas as gpd
 import os
-from .ingest_usda import get_usda_yield
-from .ingest_noaa import get_noaa_weather
+from .ingest_usda import fetch_usda_yield, mock_usda_yield
+from .ingest_noaa import fetch_noaa_weather
 from .ingest_sentinel import get_sentinel_ndvi
+from .frames import sql_dates
+from .import_ndvi import import_ndvi_file
 
 def init_db(conn):
     """Create schema from sql/schema.sql"""
     schema_path = 'sql/schema.sql'
     if not os.path.exists(schema_path):
         raise FileNotFoundError(f"Schema file not found: {schema_path}")
+    _dedupe_legacy_ndvi(conn)
     with open(schema_path, 'r') as f:
         conn.executescript(f.read())
     conn.commit()
     print("Database schema initialized")
 
-def merge_to_db():
-    db_path = "data/weekly_pipeline.db"
-    processed_dir = "data/processed"
-    os.makedirs(processed_dir, exist_ok=True)
-    
-    conn = sqlite3.connect(db_path)
-    
-    # INIT SCHEMA
-    init_db(conn)
-    
-    # 1. USDA
-    usda_df = get_usda_yield()
-    usda_df.to_sql('usda_yield', conn, if_exists='replace', index=False)
-    
-    # 2. NOAA
-    weather_df = get_noaa_weather()
-    
-    # Force correct dtypes
-    weather_df['date'] = pd.to_datetime(weather_df['date']).dt.date  # → date, not datetime
-    if 'tmax' in weather_df.columns:
-        weather_df['tmax'] = pd.to_numeric(weather_df['tmax'], errors='coerce')
-    if 'tmin' in weather_df.columns:
-        weather_df['tmin'] = pd.to_numeric(weather_df['tmin'], errors='coerce')
-    if 'prcp' in weather_df.columns:
-        weather_df['prcp'] = pd.to_numeric(weather_df['prcp'], errors='coerce')
-    if 'gdd' in weather_df.columns:
-        weather_df['gdd'] = pd.to_numeric(weather_df['gdd'], errors='coerce')
+def _dedupe_legacy_ndvi(conn):
+    """Older DBs have sentinel_ndvi without the unique (field_id, date) index"""
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sentinel_ndvi'").fetchone()
+    has_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_ndvi_field_date'").fetchone()
+    if has_table and not has_index:
+        conn.execute("""
+            DELETE FROM sentinel_ndvi WHERE rowid NOT IN (
+                SELECT MIN(rowid) FROM sentinel_ndvi GROUP BY field_id, date)
+        """)
+        conn.commit()
 
+def save_usda(conn, usda_df):
+    """Replace the years covered by usda_df"""
+    if usda_df.empty:
+        return 0
+    years = (int(usda_df['year'].min()), int(usda_df['year'].max()))
+    rows = list(zip(usda_df['year'].astype(int).tolist(),
+                    usda_df['commodity'].tolist(),
+                    pd.to_numeric(usda_df['yield_bu_acre'], errors='coerce').tolist()))
+    with conn:
+        conn.execute("DELETE FROM usda_yield WHERE year BETWEEN ? AND ?", years)
+        conn.executemany(
+            "INSERT INTO usda_yield (year, commodity, yield_bu_acre) VALUES (?, ?, ?)", rows)
+    return len(rows)
+
+def save_weather(conn, weather_df):
+    """Replace the date range covered by weather_df"""
+    if weather_df.empty:
+        return 0
     # Ensure all columns exist
     for col in ['tmax', 'tmin', 'prcp', 'gdd']:
         if col not in weather_df.columns:
-            weather_df[col] = pd.NA
+            weather_df[col] = float('nan')
 
-    weather_df = weather_df[['date', 'tmax', 'tmin', 'prcp', 'gdd']]
-    weather_df.to_sql('weather_daily', conn, if_exists='replace', index=False)
-    print(f"NOAA: {len(weather_df)} records saved")
-    
-    # 3. Fields (from GeoJSON)
+    # Store full precision (float64); compact dtypes are only for loading
+    weather_df = weather_df[['date', 'tmax', 'tmin', 'prcp', 'gdd']].copy()
+    for col in ['tmax', 'tmin', 'prcp', 'gdd']:
+        weather_df[col] = pd.to_numeric(weather_df[col], errors='coerce').astype('float64')
+    weather_df['date'] = pd.to_datetime(weather_df['date'])
+    weather_df = sql_dates(weather_df)
+    rows = list(zip(*(weather_df[c].tolist() for c in ['date', 'tmax', 'tmin', 'prcp', 'gdd'])))
+    with conn:
+        conn.execute("DELETE FROM weather_daily WHERE date BETWEEN ? AND ?",
+                     (weather_df['date'].min(), weather_df['date'].max()))
+        conn.executemany(
+            "INSERT INTO weather_daily (date, tmax, tmin, prcp, gdd) VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def load_fields_gdf():
     fields_path = "data/raw/fields.geojson"
     if not os.path.exists(fields_path):
         from create_sample_fields import create_sample_fields
         create_sample_fields()
-    fields_gdf = gpd.read_file(fields_path)
+    return gpd.read_file(fields_path)
+
+def save_fields(conn, fields_gdf):
     fields_df = fields_gdf[['field_id', 'crop_2025']].copy()
     fields_df.to_sql('farm_fields', conn, if_exists='replace', index=False)
+
+def merge_to_db(db_path="data/weekly_pipeline.db"):
+    """Build all tables into db_path (a staging snapshot when run from the pipeline)"""
+    processed_dir = "data/processed"
+    os.makedirs(processed_dir, exist_ok=True)
     
-# 4. NDVI
+    conn = sqlite3.connect(db_path)
+    
+    # INIT SCHEMA
+    init_db(conn)
+    
+    # 1. USDA (mock only for an empty table: never overwrite real history)
+    try:
+        usda_df = fetch_usda_yield()
+    except Exception as e:
+        print(f"USDA failed: {e}")
+        has_rows = conn.execute("SELECT 1 FROM usda_yield LIMIT 1").fetchone()
+        usda_df = pd.DataFrame() if has_rows else mock_usda_yield()
+    save_usda(conn, usda_df)
+    
+    # 2. NOAA (never mock: fake days would feed GDD totals and forecasts as
+    # real weather; the dashboard shows sample weather while the table is empty)
+    try:
+        weather_df = fetch_noaa_weather()
+    except Exception as e:
+        print(f"NOAA failed: {e} → weather not updated")
+        weather_df = pd.DataFrame()
+    n = save_weather(conn, weather_df)
+    print(f"NOAA: {n} records saved")
+    
+    # 3. Fields (from GeoJSON)
+    save_fields(conn, load_fields_gdf())
+    
+# 4. NDVI (streamed, deduped, checkpointed)
     ndvi_csv = os.path.join(processed_dir, "ndvi_zonal.csv")
     if os.path.exists(ndvi_csv):
-        df = pd.read_csv(ndvi_csv)
-        print(f"NDVI CSV columns: {list(df.columns)}")  # DEBUG
-
-        # Auto-map
-        col_map = {}
-        for old, new in [('mean', 'ndvi_mean'), ('NDVI_mean', 'ndvi_mean'),
-                         ('stdDev', 'ndvi_std'), ('NDVI_stdDev', 'ndvi_std'),
-                         ('cloud_cover', 'cloud_cover'), ('CLOUDY_PIXEL_PERCENTAGE', 'cloud_cover')]:
-            if old in df.columns:
-                col_map[old] = new
-
-        required = ['field_id', 'date', 'ndvi_mean', 'ndvi_std']
-        missing = [c for c in required if c not in col_map.values() and c not in df.columns]
-        if missing:
-            print(f"NDVI CSV missing: {missing}")
-        else:
-            df = df.rename(columns=col_map)
-            # Only select columns that exist
-            cols_to_use = [c for c in ['field_id', 'date', 'ndvi_mean', 'ndvi_std', 'cloud_cover'] if c in df.columns]
-            df = df[cols_to_use].copy()
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            # Fill missing cloud_cover
-            if 'cloud_cover' not in df.columns:
-                df['cloud_cover'] = 0.0
-            df.to_sql('sentinel_ndvi', conn, if_exists='append', index=False)
-            print(f"Loaded {len(df)} NDVI records")
+        n = import_ndvi_file(conn, ndvi_csv)
+        print(f"Loaded {n} NDVI records")
     else:
         print(f"NDVI CSV not found: {ndvi_csv}")
 
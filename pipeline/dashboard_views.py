@@ -0,0 +1,99 @@
+# pipeline/dashboard_views.py
+"""Small precomputed tables the dashboard reads instead of the raw history.
+
+Built at the end of each pipeline run, inside the staging snapshot, so they
+are published atomically with the data they summarize. Every table is
+bounded by the number of fields (or MAX_POINTS per field), not by history.
+"""
+import sqlite3
+import pandas as pd
+from .yield_model import train_yield_model, get_benchmarks
+
+# Chart buckets per field in mv_ndvi_series (plus one for the latest observation)
+MAX_POINTS = 200
+
+VIEWS_SQL = {
+    # SQLite: with MAX(), bare columns come from the row holding the max
+    'mv_latest_ndvi': """
+        SELECT field_id, MAX(date) AS date, ndvi_mean
+        FROM sentinel_ndvi
+        GROUP BY field_id
+    """,
+    # Fixed number of time buckets per field, whatever the history length.
+    # Each point sits at its bucket's last date, and the latest observation is
+    # a bucket of its own, so the series ends on the value mv_latest_ndvi shows.
+    'mv_ndvi_series': """
+        SELECT field_id, MAX(date) AS date, AVG(ndvi_mean) AS ndvi_mean, COUNT(*) AS n_obs
+        FROM (
+            SELECT field_id, date, ndvi_mean,
+                   CASE WHEN date = MAX(date) OVER w THEN :points
+                        ELSE CAST((julianday(date) - MIN(julianday(date)) OVER w) * :points
+                                  / (MAX(julianday(date)) OVER w - MIN(julianday(date)) OVER w + 1)
+                                  AS INTEGER)
+                   END AS bucket
+            FROM sentinel_ndvi
+            WINDOW w AS (PARTITION BY field_id)
+        )
+        GROUP BY field_id, bucket
+    """,
+    # Week starts Monday
+    'mv_weather_weekly': """
+        SELECT date(date, '-6 days', 'weekday 1') AS week_start,
+               AVG(tmax) AS tmax, AVG(tmin) AS tmin, SUM(prcp) AS prcp, SUM(gdd) AS gdd
+        FROM weather_daily
+        GROUP BY week_start
+    """,
+    'mv_weather_latest': """
+        SELECT date, tmax, tmin, prcp, gdd
+        FROM weather_daily
+        ORDER BY date DESC
+        LIMIT 1
+    """,
+}
+
+INDEXES = [
+    "CREATE INDEX idx_mv_ndvi_series_field ON mv_ndvi_series (field_id, date)",
+    "CREATE UNIQUE INDEX idx_mv_latest_ndvi_field ON mv_latest_ndvi (field_id)",
+]
+
+
+def _yield_predictions(db_path):
+    try:
+        yield_df, hist_yield = train_yield_model(db_path)
+    except ValueError as e:  # e.g. no NDVI yet → nothing to fit
+        print(f"Yield model skipped: {e}")
+        yield_df, hist_yield = pd.DataFrame(columns=['field_id', 'yield_pred']), float('nan')
+    yield_df = yield_df.copy()
+    yield_df['field_id'] = yield_df['field_id'].astype(str)
+    yield_df['hist_yield'] = hist_yield
+    return yield_df
+
+
+def build_dashboard_views(db_path="data/weekly_pipeline.db"):
+    """(Re)build all mv_* tables in db_path"""
+    yield_df = _yield_predictions(db_path)
+    hist_ndvi, county_avg = get_benchmarks(db_path)
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for name, sql in VIEWS_SQL.items():
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            conn.execute(f"CREATE TABLE {name} AS {sql}", {'points': MAX_POINTS})
+        for sql in INDEXES:
+            conn.execute(sql)
+
+    yield_df.to_sql('mv_yield_predictions', conn, if_exists='replace', index=False)
+
+    # Per-field benchmark deltas
+    latest = pd.read_sql("SELECT field_id, ndvi_mean FROM mv_latest_ndvi", conn)
+    bench = latest.merge(yield_df, on='field_id', how='left')
+    bench['hist_ndvi'] = hist_ndvi
+    bench['ndvi_delta'] = bench['ndvi_mean'] - hist_ndvi
+    bench['county_avg'] = county_avg
+    bench['yield_delta'] = bench['yield_pred'] - county_avg
+    bench = bench[['field_id', 'ndvi_mean', 'hist_ndvi', 'ndvi_delta',
+                   'yield_pred', 'county_avg', 'yield_delta']]
+    bench.to_sql('mv_benchmarks', conn, if_exists='replace', index=False)
+
+    conn.close()
+    print(f"Dashboard views built: {len(latest)} fields")
@@ -0,0 +1,18 @@
+# pipeline/finalize.py
+"""Derived tables every snapshot needs before it is published.
+
+Forecasts, mv_* dashboard tables and weekly reports are all computed from
+the raw tables, so any producer that changes raw data (weekly run,
+backfill.py, NDVI import) must rebuild them in the same staging DB.
+"""
+from .dashboard_views import build_dashboard_views
+from .forecast import run_forecasts
+from .reports import build_reports
+
+
+def finalize_snapshot(db_path):
+    """Rebuild forecasts, dashboard views and reports in db_path (in that order:
+    the yield model reads forecasts, reports read both)"""
+    run_forecasts(db_path)
+    build_dashboard_views(db_path)
+    build_reports(db_path)
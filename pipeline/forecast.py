@@ -0,0 +1,160 @@
+# pipeline/forecast.py
+"""Per-series seasonal forecasts: NDVI per field, cumulative GDD per farm.
+
+Each series gets a Prophet-style additive model (linear trend + yearly
+Fourier seasonality, ridge-penalized seasonal terms) fit with numpy least
+squares, so thousands of fields fit in seconds without a Stan backend.
+Fits run in a process pool and are cached by a hash of the series data:
+only series with new observations are refit. Results go to `forecasts`.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from .frames import load_ndvi, load_weather
+from .parallel import pool_map
+
+MODEL_VERSION = "fourier-v2"  # bump to invalidate every cached fit
+HORIZON_DAYS = 90
+FOURIER_ORDER = 3
+SEASONAL_PRIOR = 1.0  # ridge penalty on seasonal terms (like Prophet's seasonality prior)
+MIN_OBS = 5
+Z = 1.96  # 95% interval
+FARM_ID = "farm"
+
+
+def _design(days, t0, scale):
+    t = np.asarray(days, dtype=float)
+    cols = [np.ones_like(t), (t - t0) / scale]
+    for k in range(1, FOURIER_ORDER + 1):
+        w = 2 * np.pi * k * t / 365.25
+        cols += [np.sin(w), np.cos(w)]
+    return np.column_stack(cols)
+
+
+def fit_predict(days, values, horizon=HORIZON_DAYS):
+    """Fit trend + seasonality to (day ordinal, value) and forecast `horizon` days.
+
+    Returns (future_days, yhat, sigma, scale); interval width grows with the
+    distance from the last observation, as with Prophet's trend uncertainty.
+    """
+    days = np.asarray(days, dtype=float)
+    values = np.asarray(values, dtype=float)
+    t0 = days[0]
+    scale = max(days[-1] - days[0], 1.0)
+    X = _design(days, t0, scale)
+    penalty = np.diag([0.0, 0.0] + [SEASONAL_PRIOR] * (2 * FOURIER_ORDER))
+    beta = np.linalg.solve(X.T @ X + penalty, X.T @ values)
+    resid = values - X @ beta
+    sigma = np.sqrt(resid @ resid / max(len(values) - 2, 1))
+
+    future = np.arange(days[-1] + 1, days[-1] + horizon + 1)
+    yhat = _design(future, t0, scale) @ beta
+    return future, yhat, sigma, scale
+
+
+def _forecast_ndvi(days, values, horizon):
+    future, yhat, sigma, scale = fit_predict(days, values, horizon)
+    width = Z * sigma * np.sqrt(1 + (future - days[-1]) / scale)
+    return future, np.clip(yhat, -1, 1), np.clip(yhat - width, -1, 1), np.clip(yhat + width, -1, 1)
+
+
+def _forecast_gdd_cum(days, values, horizon):
+    """Forecast daily GDD, then accumulate on top of the season-to-date total.
+
+    The season is the calendar year, so the forecast stops at December 31.
+    """
+    future, yhat, sigma, _ = fit_predict(days, values, horizon)
+    season_year = np.datetime64(int(days[-1]), 'D').astype('datetime64[Y]')
+    in_horizon = future.astype('datetime64[D]').astype('datetime64[Y]') == season_year
+    future, yhat = future[in_horizon], yhat[in_horizon]
+    in_season = np.asarray(days).astype('datetime64[D]').astype('datetime64[Y]') == season_year
+    base = values[in_season].sum()
+    cum = base + np.cumsum(np.clip(yhat, 0, None))
+    width = Z * sigma * np.sqrt(np.arange(1, len(future) + 1))
+    return future, cum, np.maximum(cum - width, base), cum + width
+
+
+FORECASTERS = {
+    'ndvi': _forecast_ndvi,
+    'gdd_cum': _forecast_gdd_cum,
+}
+
+
+def _fit_one(task):
+    """Worker: (series_type, series_id, days, values, horizon) → rows for `forecasts`"""
+    series_type, series_id, days, values, horizon = task
+    future, yhat, lower, upper = FORECASTERS[series_type](days, values, horizon)
+    dates = future.astype('int64').astype('datetime64[D]').astype(str)
+    return series_type, series_id, list(zip(
+        [series_type] * len(dates), [series_id] * len(dates), dates.tolist(),
+        yhat.tolist(), lower.tolist(), upper.tolist()))
+
+
+def series_hash(days, values, horizon):
+    h = hashlib.sha1(f"{MODEL_VERSION}:{horizon}:".encode())
+    h.update(np.ascontiguousarray(days, dtype='int64').tobytes())
+    h.update(np.ascontiguousarray(values, dtype='float64').tobytes())
+    return h.hexdigest()
+
+
+def _day_ordinals(dates):
+    return dates.to_numpy().astype('datetime64[D]').astype('int64')
+
+
+def build_tasks(ndvi, weather, horizon=HORIZON_DAYS):
+    """One task per series with enough observations"""
+    tasks = []
+    # One value per field per day, sorted by field then date; split on field boundaries
+    daily = (ndvi.dropna(subset=['ndvi_mean'])
+             .groupby(['field_id', 'date'], observed=True, sort=True)['ndvi_mean'].mean()
+             .reset_index())
+    ids = daily['field_id'].to_numpy()
+    days = _day_ordinals(daily['date'])
+    values = daily['ndvi_mean'].to_numpy('float64')
+    bounds = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+        if end - start >= MIN_OBS:
+            tasks.append(('ndvi', str(ids[start]), days[start:end], values[start:end], horizon))
+    weather = weather.dropna(subset=['gdd']).sort_values('date')
+    if len(weather) >= MIN_OBS:
+        tasks.append(('gdd_cum', FARM_ID, _day_ordinals(weather['date']),
+                      weather['gdd'].to_numpy('float64'), horizon))
+    return tasks
+
+
+def fit_all(tasks, workers=None):
+    """Fit tasks in a process pool (inline when there are only a few)"""
+    return pool_map(_fit_one, tasks, workers, min_items=32)
+
+
+def run_forecasts(db_path="data/weekly_pipeline.db", workers=None, horizon=HORIZON_DAYS):
+    """Refit changed series and write their forecasts. Returns (refit, cached)."""
+    conn = sqlite3.connect(db_path)
+    tasks = build_tasks(load_ndvi(conn), load_weather(conn, columns=('date', 'gdd')), horizon)
+
+    cached = {(t, s): h for t, s, h in
+              conn.execute("SELECT series_type, series_id, data_hash FROM forecast_fits")}
+    hashes = {(t[0], t[1]): series_hash(t[2], t[3], horizon) for t in tasks}
+    todo = [t for t in tasks if cached.get((t[0], t[1])) != hashes[(t[0], t[1])]]
+
+    results = fit_all(todo, workers)
+
+    fitted_at = datetime.now().isoformat(timespec='seconds')
+    with conn:
+        for series_type, series_id, rows in results:
+            conn.execute("DELETE FROM forecasts WHERE series_type = ? AND series_id = ?",
+                         (series_type, series_id))
+            conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO forecast_fits VALUES (?, ?, ?, ?)",
+                         (series_type, series_id, hashes[(series_type, series_id)], fitted_at))
+        # Series that no longer exist (removed fields)
+        live = set(hashes)
+        for key in set(cached) - live:
+            conn.execute("DELETE FROM forecasts WHERE series_type = ? AND series_id = ?", key)
+            conn.execute("DELETE FROM forecast_fits WHERE series_type = ? AND series_id = ?", key)
+    conn.close()
+    print(f"Forecasts: {len(todo)} series refit, {len(tasks) - len(todo)} cached")
+    return len(todo), len(tasks) - len(todo)
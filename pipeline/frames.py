@@ -0,0 +1,96 @@
+# pipeline/frames.py
+"""Typed loading layer: compact dtypes for NDVI / weather / field frames.
+
+Default pandas dtypes cost a lot at scale (object field_id, Python `date`
+objects, float64 everywhere). Everything that reads these tables from the DB
+or from CSV should go through the helpers here.
+"""
+import pandas as pd
+from pandas.api.types import union_categoricals, is_datetime64_any_dtype
+
+# Column -> dtype. Dates are handled separately (native datetime64).
+NDVI_DTYPES = {
+    'field_id': 'category',
+    'ndvi_mean': 'float32',
+    'ndvi_std': 'float32',
+    'cloud_cover': 'float32',
+}
+WEATHER_DTYPES = {
+    'tmax': 'float32',
+    'tmin': 'float32',
+    'prcp': 'float32',
+    'gdd': 'float32',
+}
+FIELD_DTYPES = {
+    'field_id': 'category',
+    'crop_2025': 'category',
+}
+
+DATE_COLS = ('date',)
+CHUNKSIZE = 250_000
+
+
+def compact(df, dtypes, date_cols=DATE_COLS):
+    """Cast columns of `df` to compact dtypes (category / float32 / datetime64)"""
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'category':
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    for col in date_cols:
+        if col in df.columns and not is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format='ISO8601')
+    return df
+
+
+def concat_compact(chunks):
+    """Concat typed chunks without losing categoricals (categories differ per chunk)"""
+    if len(chunks) == 1:
+        return chunks[0]
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            cats = union_categoricals([c[col] for c in chunks]).categories
+            for c in chunks:
+                c[col] = c[col].cat.set_categories(cats)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_typed(conn, query, dtypes, params=None, chunksize=CHUNKSIZE):
+    """Chunked read_sql with dtype enforcement applied to every chunk"""
+    chunks = [compact(chunk, dtypes)
+              for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize)]
+    if not chunks:
+        # Empty result: still return the right columns / dtypes
+        return compact(pd.read_sql_query(query, conn, params=params), dtypes)
+    return concat_compact(chunks)
+
+
+def load_ndvi(conn, columns=('field_id', 'date', 'ndvi_mean'), field_id=None):
+    query = f"SELECT {', '.join(columns)} FROM sentinel_ndvi"
+    params = None
+    if field_id is not None:
+        query += " WHERE field_id = ?"
+        params = (field_id,)
+    return read_typed(conn, query, NDVI_DTYPES, params=params)
+
+
+def load_weather(conn, columns=('date', 'tmax', 'tmin', 'prcp', 'gdd')):
+    return read_typed(conn, f"SELECT {', '.join(columns)} FROM weather_daily", WEATHER_DTYPES)
+
+
+def load_fields(conn):
+    return read_typed(conn, "SELECT field_id, crop_2025 FROM farm_fields", FIELD_DTYPES)
+
+
+def sql_dates(df, date_cols=DATE_COLS):
+    """Format datetime64 columns as ISO 'YYYY-MM-DD' text before to_sql.
+
+    Writes should keep float64 values: compact() is for in-memory frames only.
+    """
+    for col in date_cols:
+        if col in df.columns and is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+    return df
@@ -0,0 +1,179 @@
+# pipeline/import_ndvi.py
+"""Streaming importer for zonal NDVI exports (CSV, CSV.gz, Parquet).
+
+Files are read in fixed-size chunks so memory stays flat regardless of file
+size. Each chunk is written in one transaction with `INSERT OR IGNORE`
+against the unique (field_id, date) index, together with its checkpoint row
+in `ndvi_imports`, so a crashed import resumes after the last committed chunk.
+
+Run standalone: python -m pipeline.import_ndvi exports/*.csv.gz
+"""
+import argparse
+import os
+import sqlite3
+import pandas as pd
+from .finalize import finalize_snapshot
+from .snapshots import begin_snapshot, publish_snapshot, release_snapshot
+
+CHUNKSIZE = 100_000
+
+# target column -> accepted source names (first match wins)
+NDVI_COLUMNS = {
+    'field_id': ['field_id'],
+    'date': ['date'],
+    'ndvi_mean': ['ndvi_mean', 'mean', 'NDVI_mean', 'NDVI'],
+    'ndvi_std': ['ndvi_std', 'stdDev', 'NDVI_stdDev'],
+    'cloud_cover': ['cloud_cover', 'CLOUDY_PIXEL_PERCENTAGE'],
+}
+REQUIRED = ['field_id', 'date', 'ndvi_mean', 'ndvi_std']
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO sentinel_ndvi (field_id, date, ndvi_mean, ndvi_std, cloud_cover)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def _is_parquet(path):
+    return path.endswith(('.parquet', '.pq'))
+
+
+def _read_header(path):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq  # optional: only needed for Parquet exports
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def map_columns(header):
+    """Return {source: target} for the columns we keep, or None if required ones are missing"""
+    col_map = {}
+    for target, sources in NDVI_COLUMNS.items():
+        for src in sources:
+            if src in header:
+                col_map[src] = target
+                break
+    missing = [c for c in REQUIRED if c not in col_map.values()]
+    if missing:
+        print(f"NDVI import: missing columns {missing} (have {list(header)})")
+        return None
+    return col_map
+
+
+def _iter_chunks(path, source_cols, chunksize):
+    """Yield DataFrames of at most `chunksize` rows with only `source_cols`"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=source_cols):
+            yield batch.to_pandas()
+    else:
+        # compression is inferred from the extension (.gz, .zip, ...)
+        yield from pd.read_csv(path, usecols=source_cols, dtype={'field_id': str},
+                               chunksize=chunksize)
+
+
+def to_ndvi_rows(chunk, col_map):
+    """Vectorized conversion of a raw chunk into sentinel_ndvi row tuples"""
+    chunk = chunk.rename(columns=col_map)
+    dates = pd.to_datetime(chunk['date'], format='ISO8601').dt.strftime('%Y-%m-%d')
+    if 'cloud_cover' in chunk.columns:
+        cloud = pd.to_numeric(chunk['cloud_cover'], errors='coerce').fillna(0.0).tolist()
+    else:
+        cloud = [0.0] * len(chunk)
+    return list(zip(
+        chunk['field_id'].astype(str).tolist(),
+        dates.tolist(),
+        pd.to_numeric(chunk['ndvi_mean'], errors='coerce').tolist(),
+        pd.to_numeric(chunk['ndvi_std'], errors='coerce').tolist(),
+        cloud,
+    ))
+
+
+def import_ndvi_file(conn, path, chunksize=CHUNKSIZE):
+    """Stream one export into sentinel_ndvi. Returns the number of new rows."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+
+    row = conn.execute(
+        "SELECT size, mtime, rows_done, completed FROM ndvi_imports WHERE path = ?", (path,)
+    ).fetchone()
+    if row and row[0] == st.st_size and row[1] == st.st_mtime:
+        if row[3]:
+            print(f"NDVI import: {os.path.basename(path)} already imported, skipping")
+            return 0
+        start = row[2]
+        print(f"NDVI import: resuming {os.path.basename(path)} at row {start:,}")
+    else:
+        # New or changed file: (re)start from the top
+        start = 0
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ndvi_imports (path, size, mtime, rows_done, rows_inserted, completed) "
+                "VALUES (?, ?, ?, 0, 0, 0)", (path, st.st_size, st.st_mtime))
+
+    # Column auto-mapping is resolved once from the header
+    col_map = map_columns(_read_header(path))
+    if col_map is None:
+        return 0
+
+    offset = 0
+    inserted = 0
+    for chunk in _iter_chunks(path, list(col_map), chunksize):
+        end = offset + len(chunk)
+        if end <= start:
+            offset = end
+            continue
+        if offset < start:
+            chunk = chunk.iloc[start - offset:]
+        rows = to_ndvi_rows(chunk, col_map)
+        with conn:  # one transaction per chunk, checkpoint included
+            before = conn.total_changes
+            conn.executemany(INSERT_SQL, rows)
+            added = conn.total_changes - before
+            conn.execute(
+                "UPDATE ndvi_imports SET rows_done = ?, rows_inserted = rows_inserted + ? WHERE path = ?",
+                (end, added, path))
+        inserted += added
+        offset = end
+
+    with conn:
+        conn.execute("UPDATE ndvi_imports SET completed = 1 WHERE path = ?", (path,))
+    print(f"NDVI import: {os.path.basename(path)} → {inserted:,} new rows ({offset:,} read)")
+    return inserted
+
+
+def import_ndvi_files(conn, paths, chunksize=CHUNKSIZE):
+    return sum(import_ndvi_file(conn, p, chunksize=chunksize) for p in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream NDVI exports into sentinel_ndvi")
+    parser.add_argument("paths", nargs="+", help="CSV, CSV.gz or Parquet files")
+    parser.add_argument("--db", default="data/weekly_pipeline.db")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+
+    # Import into a staging snapshot and publish it, like the weekly pipeline
+    # (a crashed import leaves its staging DB behind and resumes from it)
+    staging = begin_snapshot(args.db, producer="import_ndvi")
+    conn = sqlite3.connect(staging)
+    has_schema = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ndvi_imports'").fetchone()
+    if not has_schema:
+        conn.close()
+        os.remove(staging)
+        release_snapshot(staging)
+        raise SystemExit(f"{args.db} has no NDVI import tables; run the pipeline once first")
+    try:
+        total = import_ndvi_files(conn, args.paths, chunksize=args.chunksize)
+        conn.close()
+        # Dashboard tables, forecasts and reports must match the new NDVI
+        finalize_snapshot(staging)
+        publish_snapshot(staging, args.db)
+    except BaseException:
+        release_snapshot(staging)  # staging is kept; rerunning the import resumes it
+        raise
+    print(f"NDVI import: {total:,} new rows total")
+
+
+if __name__ == "__main__":
+    main()
@@ -64,13 +64,13 @@ def save_cached_station(station_id):
     with open(CACHE_FILE, 'w') as f:
         json.dump(cache, f)
 
-def get_noaa_weather():
+def fetch_noaa_weather():
+    """Last 30 days of station weather; raises on failure (no mock)"""
     cfg = load_config()
     token = cfg['data_sources']['noaa']['token']
 
     if token == "YOUR_NOAA_TOKEN_HERE":
-        print("NOAA token missing → using mock data")
-        return _mock_weather()
+        raise RuntimeError("NOAA token missing")
 
     # === PRIORITIZE CONFIG STATION ===
     config_station = cfg['data_sources']['noaa'].get('station_id')
@@ -90,14 +90,41 @@ def get_noaa_weather():
     # Fetch data
     data = _fetch_noaa_data(station_id, token)
     if not data:
-        print("No data from any station → using mock")
-        return _mock_weather()
+        raise RuntimeError(f"No data from station {station_id}")
 
     print(f"NOAA: {len(data)} records from {station_id}")
+    df = _to_weather_frame(data)
+    if df is None:
+        raise RuntimeError(f"No usable TMAX/TMIN/PRCP rows from {station_id}")
+    return df
+
+def get_noaa_weather():
+    try:
+        return fetch_noaa_weather()
+    except Exception as e:
+        print(f"NOAA failed: {e} → using mock data")
+        return mock_weather()
+
+def fetch_noaa_range(station_id, token, start, end):
+    """Daily weather for [start, end] as a frame; None if the request failed"""
+    data = _fetch_noaa_data(station_id, token, start, end)
+    if data is None:
+        return None
+    df = _to_weather_frame(data)
+    return df if df is not None else pd.DataFrame(columns=['date', 'tmax', 'tmin', 'prcp', 'gdd'])
+
+def resolve_station(token):
+    cfg = load_config()
+    return cfg['data_sources']['noaa'].get('station_id') or _get_or_find_station(token)
+
+def _to_weather_frame(data):
+    """Raw CDO results → date, tmax, tmin, prcp, gdd (None if no usable rows)"""
     df = pd.DataFrame(data)
+    if df.empty:
+        return None
     df = df[df['datatype'].isin(['TMAX', 'TMIN', 'PRCP'])]
     if df.empty:
-        return _mock_weather()
+        return None
 
     df = df.pivot(index='date', columns='datatype', values='value').reset_index()
     df['date'] = pd.to_datetime(df['date'])
@@ -125,10 +152,12 @@ def get_noaa_weather():
             cols.append(c)
     return df[cols].dropna(subset=['date'])
 
-def _fetch_noaa_data(station_id, token):
-    """Fetch raw data from NOAA (helper)"""
-    end = datetime.today().strftime('%Y-%m-%d')
-    start = (datetime.today() - timedelta(days=30)).strftime('%Y-%m-%d')
+def _fetch_noaa_data(station_id, token, start=None, end=None):
+    """Fetch raw data from NOAA (helper). Defaults to the last 30 days."""
+    if end is None:
+        end = datetime.today().strftime('%Y-%m-%d')
+    if start is None:
+        start = (datetime.today() - timedelta(days=30)).strftime('%Y-%m-%d')
 
     url = "https://www.ncdc.noaa.gov/cdo-web/api/v2/data"
     params = {
@@ -189,7 +218,7 @@ def _get_or_find_station(token):
         save_cached_station(station_id)
     return station_id
 
-def _mock_weather():
+def mock_weather():
     dates = pd.date_range(end=datetime.today(), periods=5, freq='D')
     return pd.DataFrame({
         'date': dates,
@@ -44,7 +44,7 @@ def _init_ee():
 # Initialize at import
 _ee_ready = _init_ee()
 
-def get_sentinel_ndvi(fields_gdf, days_back=30):
+def get_sentinel_ndvi(fields_gdf, days_back=30, start_date=None, end_date=None):
     if not _ee_ready:
         print("EE not available → returning mock NDVI")
         # Return mock data for demo
@@ -61,55 +61,59 @@ def get_sentinel_ndvi(fields_gdf, days_back=30):
 
     # === REAL EE CODE BELOW ===
     try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days_back)
-
-        # Convert GDF to EE FeatureCollection
-        features = []
-        for _, row in fields_gdf.iterrows():
-            geom = row.geometry.__geo_interface__
-            feature = ee.Feature(geom, {'field_id': row['field_id']})
-            features.append(feature)
-        fc = ee.FeatureCollection(features)
-
-        # Sentinel-2
-        collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-                      .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-                      .filterBounds(fc)
-                      .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)))
-
-        def calculate_ndvi(image):
-            ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
-            return image.addBands(ndvi)
-
-        collection = collection.map(calculate_ndvi)
-
-        def zonal_stats(image):
-            stats = image.reduceRegions(
-                collection=fc,
-                reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True),
-                scale=10
-            )
-            date = ee.Date(image.get('system:time_start')).format('YYYY-MM-dd')
-            return stats.map(lambda f: f.set('date', date))
-
-        results = collection.map(zonal_stats).flatten()
-
-        # Get data
-        data = results.getInfo()['features']
-        records = []
-        for feat in data:
-            props = feat['properties']
-            if 'NDVI' in props:
-                records.append({
-                    'field_id': props['field_id'],
-                    'date': props['date'],
-                    'ndvi_mean': props['NDVI'],
-                    'ndvi_std': props.get('NDVI_stdDev', None)
-                })
-        return pd.DataFrame(records)
-
+        return fetch_sentinel_ndvi(fields_gdf, days_back, start_date, end_date)
     except Exception as e:
         print(f"EE query failed: {e}")
         return pd.DataFrame()  # empty
-    
\ No newline at end of file
+
+def fetch_sentinel_ndvi(fields_gdf, days_back=30, start_date=None, end_date=None):
+    """Zonal NDVI per field from Earth Engine; raises on failure (no mock)"""
+    if not _ee_ready:
+        raise RuntimeError("Earth Engine not initialized")
+    end_date = pd.Timestamp(end_date) if end_date is not None else datetime.now()
+    start_date = pd.Timestamp(start_date) if start_date is not None else end_date - timedelta(days=days_back)
+
+    # Convert GDF to EE FeatureCollection
+    features = []
+    for _, row in fields_gdf.iterrows():
+        geom = row.geometry.__geo_interface__
+        feature = ee.Feature(geom, {'field_id': row['field_id']})
+        features.append(feature)
+    fc = ee.FeatureCollection(features)
+
+    # Sentinel-2
+    collection = (ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+                  .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+                  .filterBounds(fc)
+                  .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)))
+
+    def calculate_ndvi(image):
+        ndvi = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+        return image.addBands(ndvi)
+
+    collection = collection.map(calculate_ndvi)
+
+    def zonal_stats(image):
+        stats = image.reduceRegions(
+            collection=fc,
+            reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True),
+            scale=10
+        )
+        date = ee.Date(image.get('system:time_start')).format('YYYY-MM-dd')
+        return stats.map(lambda f: f.set('date', date))
+
+    results = collection.map(zonal_stats).flatten()
+
+    # Get data
+    data = results.getInfo()['features']
+    records = []
+    for feat in data:
+        props = feat['properties']
+        if 'NDVI' in props:
+            records.append({
+                'field_id': props['field_id'],
+                'date': props['date'],
+                'ndvi_mean': props['NDVI'],
+                'ndvi_std': props.get('NDVI_stdDev', None)
+            })
+    return pd.DataFrame(records)
@@ -0,0 +1,14 @@
+# pipeline/parallel.py
+"""Process-pool map shared by the CPU-bound pipeline stages (forecasts, reports)."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def pool_map(fn, items, workers=None, min_items=8):
+    """list(map(fn, items)) in a process pool; inline below min_items or with workers=1,
+    where pool startup would cost more than it saves"""
+    if len(items) < min_items or workers == 1:
+        return [fn(item) for item in items]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items, chunksize=max(1, len(items) // (workers * 4))))
@@ -0,0 +1,278 @@
+# pipeline/reports.py
+"""Weekly PDF reports: one per field plus a whole-farm summary.
+
+Rendered in a worker pool at the end of the pipeline, from the mv_* views
+and forecasts. Files are content-addressed (data/reports/<hash>.pdf, hash of
+the report's input data), so a field whose data did not change is not
+re-rendered. The `reports` table maps each (kind, report_id) to its file;
+the dashboard only serves those prebuilt files. Files no kept snapshot
+refers to are deleted by prune_reports (called from prune_snapshots).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from .parallel import pool_map
+
+REPORT_VERSION = "weekly-v1"  # bump when the layout changes to re-render everything
+REPORTS_DIR = "data/reports"
+FARM_REPORT_ID = "farm"  # report_id of the one kind='farm' report
+
+# Rebuilt on every run, like the mv_* tables
+REPORTS_TABLE_SQL = """
+    CREATE TABLE reports (
+        kind TEXT,       -- 'field' or 'farm'
+        report_id TEXT,  -- field_id, or FARM_REPORT_ID
+        as_of DATE,
+        content_hash TEXT,
+        path TEXT,
+        PRIMARY KEY (kind, report_id)
+    )
+"""
+NDVI_ALERT = 0.6
+NDVI_SCOUT = 0.5
+
+
+def ndvi_recommendation(ndvi_mean):
+    """Alert text for a field's latest NDVI, or None if it looks healthy"""
+    if ndvi_mean is None or pd.isna(ndvi_mean) or ndvi_mean >= NDVI_ALERT:
+        return None
+    return "Scout for pests" if ndvi_mean < NDVI_SCOUT else "Check irrigation"
+
+
+def weather_recommendation(prcp, gdd):
+    if prcp is not None and gdd is not None and prcp < 0.1 and gdd > 20:
+        return "Hot & dry: Schedule irrigation for all fields"
+    return None
+
+
+def _clean(value):
+    """JSON-safe, rounded so float noise doesn't change the content hash"""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), 4)
+
+
+def _points(df, x, y):
+    return [[str(d)[:10], _clean(v)] for d, v in zip(df[x], df[y])]
+
+
+def build_payloads(conn):
+    """Input data for every report, as plain JSON-able dicts"""
+    fields = pd.read_sql("SELECT field_id, crop_2025 FROM farm_fields", conn)
+    latest = pd.read_sql("SELECT field_id, date, ndvi_mean FROM mv_latest_ndvi", conn)
+    bench = pd.read_sql("SELECT * FROM mv_benchmarks", conn)
+    series = pd.read_sql("SELECT field_id, date, ndvi_mean FROM mv_ndvi_series ORDER BY field_id, date", conn)
+    fcst = pd.read_sql("""SELECT series_id AS field_id, date, yhat, yhat_lower, yhat_upper
+                          FROM forecasts WHERE series_type = 'ndvi' ORDER BY series_id, date""", conn)
+    gdd = pd.read_sql("""SELECT date, yhat, yhat_lower, yhat_upper FROM forecasts
+                         WHERE series_type = 'gdd_cum' ORDER BY date DESC LIMIT 1""", conn)
+    weeks = pd.read_sql("SELECT * FROM mv_weather_weekly ORDER BY week_start DESC LIMIT 4", conn)
+    latest_weather = pd.read_sql("SELECT prcp, gdd FROM mv_weather_latest", conn)
+
+    summary = (latest.merge(fields, on='field_id', how='left')
+               .merge(bench.drop(columns=['ndvi_mean']), on='field_id', how='left'))
+    series_by_field = dict(tuple(series.groupby('field_id')))
+    fcst_by_field = dict(tuple(fcst.groupby('field_id')))
+    empty = pd.DataFrame(columns=['date', 'ndvi_mean', 'yhat', 'yhat_lower', 'yhat_upper'])
+
+    payloads = []
+    for row in summary.itertuples(index=False):
+        f = fcst_by_field.get(row.field_id, empty)
+        payloads.append({
+            'report_id': row.field_id,
+            'kind': 'field',
+            'as_of': row.date,
+            'crop': row.crop_2025,
+            'ndvi_latest': _clean(row.ndvi_mean),
+            'ndvi_delta': _clean(row.ndvi_delta),
+            'yield_pred': _clean(row.yield_pred),
+            'yield_delta': _clean(row.yield_delta),
+            'recommendation': ndvi_recommendation(row.ndvi_mean),
+            'ndvi_series': _points(series_by_field.get(row.field_id, empty), 'date', 'ndvi_mean'),
+            'ndvi_forecast': _points(f, 'date', 'yhat'),
+            'ndvi_forecast_lower': _points(f, 'date', 'yhat_lower'),
+            'ndvi_forecast_upper': _points(f, 'date', 'yhat_upper'),
+        })
+
+    w = latest_weather.iloc[0] if not latest_weather.empty else {'prcp': None, 'gdd': None}
+    g = gdd.iloc[0] if not gdd.empty else None
+    payloads.append({
+        'report_id': FARM_REPORT_ID,
+        'kind': 'farm',
+        'as_of': max(latest['date'], default=None),
+        'fields': [[p['report_id'], p['crop'], p['ndvi_latest'], p['yield_pred'], p['recommendation']]
+                   for p in payloads],
+        'weather_weeks': [[r.week_start, _clean(r.tmax), _clean(r.tmin), _clean(r.prcp), _clean(r.gdd)]
+                          for r in weeks.itertuples(index=False)],
+        'gdd_forecast': None if g is None else [g['date'], _clean(g['yhat']),
+                                                _clean(g['yhat_lower']), _clean(g['yhat_upper'])],
+        'weather_recommendation': weather_recommendation(_clean(w['prcp']), _clean(w['gdd'])),
+    })
+    return payloads
+
+
+def content_hash(payload):
+    data = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(f"{REPORT_VERSION}:{data}".encode()).hexdigest()
+
+
+def _ndvi_chart(payload, width, height):
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    lines = [payload['ndvi_series'], payload['ndvi_forecast'],
+             payload['ndvi_forecast_lower'], payload['ndvi_forecast_upper']]
+    data = [[(pd.Timestamp(d).toordinal(), v) for d, v in line if v is not None] for line in lines]
+    data = [line for line in data if line]
+    drawing = Drawing(width, height)
+    if not data:
+        return drawing
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 40, 20, width - 60, height - 40
+    plot.data = data
+    plot.yValueAxis.valueMin, plot.yValueAxis.valueMax = 0, 1
+    # Explicit x range: with a single point reportlab's auto range starts at 0 (not a date)
+    xs = [x for line in data for x, _ in line]
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = min(xs), max(max(xs), min(xs) + 1)
+    plot.xValueAxis.labelTextFormat = lambda x: pd.Timestamp.fromordinal(int(x)).strftime('%b %d')
+    styles = [(colors.darkgreen, None), (colors.blue, (3, 2)), (colors.lightblue, None), (colors.lightblue, None)]
+    for i, (color, dash) in enumerate(styles[:len(data)]):
+        plot.lines[i].strokeColor = color
+        plot.lines[i].strokeDashArray = dash
+    drawing.add(plot)
+    return drawing
+
+
+def _fmt(value, spec, suffix=""):
+    return "n/a" if value is None else f"{value:{spec}}{suffix}"
+
+
+def render_report(payload, path):
+    """Write one PDF; rendered to a temp file and renamed, so readers never see a partial file"""
+    from reportlab.graphics import renderPDF
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    c = canvas.Canvas(tmp, pagesize=letter)
+    width, height = letter
+    y = height - 60
+    c.setFont("Helvetica-Bold", 16)
+    if payload['kind'] == 'field':
+        c.drawString(50, y, f"Smart Farm Report - Field {payload['report_id']} ({payload['crop']})")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, y - 20, f"Data as of {payload['as_of']}")
+        c.drawString(50, y - 50, f"NDVI: {_fmt(payload['ndvi_latest'], '.2f')} "
+                                 f"({_fmt(payload['ndvi_delta'], '+.2f')} vs 2024)")
+        c.drawString(50, y - 70, f"Yield forecast: {_fmt(payload['yield_pred'], '.1f', ' bu/acre')} "
+                                 f"({_fmt(payload['yield_delta'], '+.1f')} vs county avg)")
+        if payload['recommendation']:
+            c.setFillColorRGB(0.7, 0, 0)
+            c.drawString(50, y - 90, f"ALERT: {payload['recommendation']}")
+            c.setFillColorRGB(0, 0, 0)
+        c.drawString(50, y - 120, "NDVI trend and 90-day forecast (95% interval)")
+        renderPDF.draw(_ndvi_chart(payload, width - 100, 250), c, 50, y - 390)
+    else:
+        c.drawString(50, y, "Smart Farm Weekly Report - Whole Farm")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, y - 20, f"Data as of {payload['as_of']}")
+        y -= 50
+        alerts = [f for f in payload['fields'] if f[4]]
+        c.drawString(50, y, f"{len(payload['fields'])} fields, {len(alerts)} below NDVI {NDVI_ALERT}")
+        y -= 25
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(50, y, "Field    Crop          NDVI    Yield (bu/acre)    Recommendation")
+        c.setFont("Helvetica", 10)
+        for field_id, crop, ndvi, pred, rec in payload['fields']:
+            y -= 15
+            if y < 140:
+                c.showPage()
+                c.setFont("Helvetica", 10)
+                y = height - 60
+            c.drawString(50, y, f"{field_id}")
+            c.drawString(95, y, f"{crop or ''}")
+            c.drawString(175, y, _fmt(ndvi, '.2f'))
+            c.drawString(220, y, _fmt(pred, '.1f'))
+            c.drawString(320, y, rec or "")
+        y -= 30
+        if payload['gdd_forecast']:
+            d, gdd, lo, hi = payload['gdd_forecast']
+            c.drawString(50, y, f"Season GDD by {d}: {gdd:.0f} (95%: {lo:.0f}-{hi:.0f})")
+            y -= 15
+        for week, tmax, tmin, prcp, gdd in payload['weather_weeks']:
+            c.drawString(50, y, f"Week of {week}: tmax {_fmt(tmax, '.0f')}  tmin {_fmt(tmin, '.0f')}  "
+                                f"prcp {_fmt(prcp, '.2f')} in  GDD {_fmt(gdd, '.0f')}")
+            y -= 15
+        if payload['weather_recommendation']:
+            c.drawString(50, y - 10, payload['weather_recommendation'])
+    c.save()
+    os.replace(tmp, path)
+    return path
+
+
+def _render_job(job):
+    payload, path = job
+    return render_report(payload, path)
+
+
+def render_all(jobs, workers=None):
+    """Render (payload, path) jobs in a process pool (inline when there are only a few)"""
+    return pool_map(_render_job, jobs, workers, min_items=8)
+
+
+def build_reports(db_path="data/weekly_pipeline.db", reports_dir=REPORTS_DIR, workers=None):
+    """Render changed reports and point the `reports` table at current files"""
+    os.makedirs(reports_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    payloads = build_payloads(conn)
+
+    rows, jobs = [], []
+    for payload in payloads:
+        digest = content_hash(payload)
+        path = os.path.join(reports_dir, f"{digest}.pdf")
+        rows.append((payload['kind'], payload['report_id'], payload['as_of'], digest, path))
+        if not os.path.exists(path):
+            jobs.append((payload, path))
+
+    render_all(jobs, workers)
+
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS reports")
+        conn.execute(REPORTS_TABLE_SQL)
+        conn.executemany("INSERT INTO reports VALUES (?, ?, ?, ?, ?)", rows)
+    conn.close()
+    print(f"Reports: {len(jobs)} rendered, {len(payloads) - len(jobs)} cached")
+    return len(jobs), len(payloads) - len(jobs)
+
+
+def _referenced_files(db_path):
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        return {os.path.basename(p) for (p,) in conn.execute("SELECT path FROM reports")}
+    except sqlite3.OperationalError:  # built before reports existed
+        return set()
+    finally:
+        conn.close()
+
+
+def prune_reports(db_paths, reports_dir=REPORTS_DIR):
+    """Delete report files that none of db_paths (the kept snapshots) refer to.
+
+    Run only while holding the snapshot lock, so no build is rendering.
+    """
+    if not os.path.isdir(reports_dir):
+        return 0
+    keep = set().union(*(_referenced_files(p) for p in db_paths))
+    removed = 0
+    for name in os.listdir(reports_dir):
+        if name not in keep and (name.endswith(".pdf") or name.endswith(".tmp")):
+            os.remove(os.path.join(reports_dir, name))
+            removed += 1
+    if removed:
+        print(f"Reports: pruned {removed} unreferenced files")
+    return removed
@@ -1,17 +1,26 @@
 import logging
 from .clean_merge import merge_to_db
 from .export_qgis import export_qgis_project
+from .finalize import finalize_snapshot
+from .snapshots import begin_snapshot, publish_snapshot, release_snapshot
 
 logging.basicConfig(filename='pipeline.log', level=logging.INFO)
 
 def run_weekly_pipeline():
     logging.info("Pipeline started")
+    # Build into a staging snapshot; the live DB only changes on publish
+    staging = begin_snapshot()
     try:
-        merge_to_db()
+        merge_to_db(staging)
+        finalize_snapshot(staging)
+        snapshot = publish_snapshot(staging)
+        logging.info(f"Snapshot published: {snapshot}")
         export_qgis_project()
         logging.info("Pipeline + QGIS export succeeded")
     except Exception as e:
-        logging.error(f"Pipeline failed: {e}")
+        # Live DB is untouched; the staging DB is kept so the next run resumes
+        logging.error(f"Pipeline failed: {e} (staging kept: {staging})")
+        release_snapshot(staging)
         raise
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+# pipeline/snapshots.py
+"""Versioned DB snapshots with atomic publish.
+
+The pipeline never writes to the live DB. It builds into a staging copy under
+data/snapshots/, then publishes by hard-linking the finished snapshot over
+data/weekly_pipeline.db with an atomic rename. Readers that already have the
+old file open keep reading the old version; new connections see the new one.
+The last KEEP_SNAPSHOTS versions stay on disk for instant rollback.
+
+One build at a time: begin_snapshot takes an exclusive lock on
+data/snapshots/.lock that is held until publish (or process exit), so the
+weekly run, backfill.py and the NDVI import CLI queue up instead of writing
+into the same staging DB. Staging DBs are tagged with the producer that
+created them, and only that producer resumes them.
+
+    python -m pipeline.snapshots list
+    python -m pipeline.snapshots rollback [VERSION]
+"""
+import argparse
+import fcntl
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+from .reports import prune_reports
+
+DB_PATH = "data/weekly_pipeline.db"
+SNAPSHOT_DIR = "data/snapshots"
+KEEP_SNAPSHOTS = 5
+LOCK_FILE = ".lock"
+
+# staging path -> open lock file, held from begin_snapshot until publish
+_locks = {}
+
+
+def _snapshot_path(version, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"weekly_pipeline.{version}.db")
+
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Published-ready versions, oldest first"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(name[len("weekly_pipeline."):-len(".db")]
+                  for name in os.listdir(snapshot_dir)
+                  if name.startswith("weekly_pipeline.") and name.endswith(".db"))
+
+
+def current_version(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Version the live DB points at (None if it isn't a published snapshot)"""
+    if not os.path.exists(db_path):
+        return None
+    live = os.stat(db_path)
+    for version in reversed(list_snapshots(snapshot_dir)):
+        if os.path.samestat(live, os.stat(_snapshot_path(version, snapshot_dir))):
+            return version
+    return None
+
+
+def db_version(db_path=DB_PATH):
+    """Cheap cache key for readers: changes every time a snapshot is published"""
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return f"{st.st_ino}-{st.st_mtime_ns}"
+
+
+def connect_readonly(db_path=DB_PATH):
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+
+def _staging_files(snapshot_dir):
+    return sorted(name for name in os.listdir(snapshot_dir) if name.endswith(".building"))
+
+
+def _lock(snapshot_dir):
+    """Exclusive lock on the snapshot dir; waits for a running build to publish"""
+    f = open(os.path.join(snapshot_dir, LOCK_FILE), "a+")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("Snapshot: another build is running, waiting for it to publish")
+        fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def release_snapshot(staging):
+    """Release the build lock without publishing (the staging DB is kept)"""
+    f = _locks.pop(staging, None)
+    if f is not None:
+        f.close()
+
+
+def _leftover_staging(db_path, snapshot_dir, producer):
+    """This producer's staging DB from a crashed run, if still based on the live version"""
+    live_mtime = os.stat(db_path).st_mtime if os.path.exists(db_path) else 0
+    leftover = None
+    for name in _staging_files(snapshot_dir):
+        path = os.path.join(snapshot_dir, name)
+        if os.stat(path).st_mtime < live_mtime:
+            os.remove(path)  # something was published since; start over
+        elif name.endswith(f".{producer}.building"):
+            if leftover:
+                os.remove(leftover)
+            leftover = path
+    return leftover
+
+
+def begin_snapshot(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR, producer="pipeline"):
+    """Lock, then create a staging DB seeded from the live one. Returns its path.
+
+    A staging DB left behind by a crashed run of the same producer is reused,
+    so checkpointed work (e.g. a half-finished NDVI import) resumes instead of
+    starting over. Other producers' leftovers are never picked up.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    lock = _lock(snapshot_dir)
+    leftover = _leftover_staging(db_path, snapshot_dir, producer)
+    if leftover:
+        print(f"Snapshot: resuming staging {leftover}")
+        _locks[leftover] = lock
+        return leftover
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    staging = f"{_snapshot_path(version, snapshot_dir)}.{producer}.building"
+    dst = sqlite3.connect(staging)
+    if os.path.exists(db_path):
+        # Incremental tables (sentinel_ndvi, ndvi_imports) carry over
+        src = connect_readonly(db_path)
+        src.backup(dst)
+        src.close()
+    dst.close()
+    _locks[staging] = lock
+    print(f"Snapshot {version}: building in {staging}")
+    return staging
+
+
+def _link_live(snapshot, db_path):
+    """Atomically point db_path at snapshot (hard link + rename)"""
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(snapshot, tmp)
+    except OSError:
+        shutil.copy2(snapshot, tmp)  # filesystem without hard links
+    os.replace(tmp, db_path)
+
+
+def publish_snapshot(staging, db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """Finalize a staging DB, make it the live version and release the lock"""
+    if staging not in _locks:
+        raise RuntimeError(f"{staging} was not started by begin_snapshot in this process")
+    snapshot = staging[:staging.rindex(".db.") + len(".db")]
+    try:
+        os.replace(staging, snapshot)
+        _link_live(snapshot, db_path)
+        prune_snapshots(db_path, snapshot_dir, keep)
+    finally:
+        release_snapshot(staging)
+    print(f"Snapshot published: {snapshot} → {db_path}")
+    return snapshot
+
+
+def prune_snapshots(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """Delete all but the newest `keep` snapshots (never the live one), then
+    the report files only deleted snapshots referred to"""
+    live = current_version(db_path, snapshot_dir)
+    versions = list_snapshots(snapshot_dir)
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version != live:
+            os.remove(_snapshot_path(version, snapshot_dir))
+    kept = [_snapshot_path(v, snapshot_dir) for v in list_snapshots(snapshot_dir)]
+    kept += [os.path.join(snapshot_dir, name) for name in _staging_files(snapshot_dir)]
+    prune_reports(kept)
+
+
+def rollback(version=None, db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Re-publish `version`, or the one before the live version"""
+    versions = list_snapshots(snapshot_dir)
+    if version is None:
+        live = current_version(db_path, snapshot_dir)
+        older = [v for v in versions if live is None or v < live]
+        if not older:
+            raise ValueError("No older snapshot to roll back to")
+        version = older[-1]
+    elif version not in versions:
+        raise ValueError(f"Unknown snapshot: {version}")
+    lock = _lock(snapshot_dir)
+    try:
+        # A crashed build was based on the version we're rolling away from
+        for name in _staging_files(snapshot_dir):
+            os.remove(os.path.join(snapshot_dir, name))
+        _link_live(_snapshot_path(version, snapshot_dir), db_path)
+    finally:
+        lock.close()
+    print(f"Rolled back: {db_path} → {version}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage published DB snapshots")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p = sub.add_parser("rollback")
+    p.add_argument("version", nargs="?")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        live = current_version()
+        for version in list_snapshots():
+            print(f"{'*' if version == live else ' '} {version}")
+    else:
+        rollback(args.version)
+
+
+if __name__ == "__main__":
+    main()
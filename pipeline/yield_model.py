@@ -5,41 +5,55 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 import sqlite3
 import warnings
+from .frames import load_ndvi, load_weather, load_fields
 warnings.filterwarnings("ignore")
 
 def train_yield_model(db_path="data/weekly_pipeline.db"):
     conn = sqlite3.connect(db_path)
     
     # Load data
-    ndvi = pd.read_sql("SELECT field_id, date, ndvi_mean FROM sentinel_ndvi", conn)
-    weather = pd.read_sql("SELECT date, gdd FROM weather_daily", conn)
-    fields = pd.read_sql("SELECT field_id, crop_2025 FROM farm_fields", conn)
+    ndvi = load_ndvi(conn)
+    weather = load_weather(conn, columns=('date', 'gdd'))
+    fields = load_fields(conn)
     usda = pd.read_sql("SELECT year, yield_bu_acre FROM usda_yield WHERE commodity='Corn'", conn)
+    # Forecast season peak NDVI per field (pipeline/forecast.py)
+    fcst = pd.read_sql("""
+        SELECT series_id AS field_id, MAX(yhat) AS ndvi_peak_fcst
+        FROM forecasts WHERE series_type = 'ndvi' GROUP BY series_id
+    """, conn)
     
     conn.close()
 
+    # Current season only: backfilled history lives in the same tables.
+    # The season is the latest NDVI year; GDD must come from the same one.
+    season = ndvi['date'].dt.year.max()
+    ndvi = ndvi[ndvi['date'].dt.year == season].sort_values('date')
+    weather = weather[weather['date'].dt.year == season]
+
     # Prep NDVI: latest + trend
-    ndvi['date'] = pd.to_datetime(ndvi['date'])
-    latest = ndvi.sort_values('date').groupby('field_id').tail(1)
-    trend = ndvi.groupby('field_id').apply(
+    latest = ndvi.groupby('field_id', observed=True).tail(1)
+    trend = ndvi.groupby('field_id', observed=True).apply(
         lambda x: np.polyfit(range(len(x)), x['ndvi_mean'], 1)[0] if len(x) > 3 else 0
     ).reset_index(name='ndvi_trend')
 
     # GDD to date
-    weather['date'] = pd.to_datetime(weather['date'])
     gdd_total = weather['gdd'].sum()
 
     # Merge
     df = latest.merge(trend, on='field_id').merge(fields, on='field_id')
+    df['field_id'] = df['field_id'].astype(str)
+    df = df.merge(fcst, on='field_id', how='left')
     df['gdd_total'] = gdd_total
     df['ndvi_latest'] = df['ndvi_mean']
-    df = df[['field_id', 'ndvi_latest', 'ndvi_trend', 'gdd_total', 'crop_2025']]
+    # Fields too short to forecast: peak so far is the latest value
+    df['ndvi_peak_fcst'] = df['ndvi_peak_fcst'].fillna(df['ndvi_latest'])
+    df = df[['field_id', 'ndvi_latest', 'ndvi_trend', 'ndvi_peak_fcst', 'gdd_total', 'crop_2025']]
 
     # Historical baseline
     hist_yield = usda['yield_bu_acre'].mean()
 
     # Simple model: NDVI + GDD → yield
-    X = df[['ndvi_latest', 'ndvi_trend', 'gdd_total']]
+    X = df[['ndvi_latest', 'ndvi_trend', 'ndvi_peak_fcst', 'gdd_total']]
     y = np.array([hist_yield + (row['ndvi_latest'] - 0.7) * 100 + row['ndvi_trend'] * 1000 
                   for _, row in df.iterrows()])
 
@@ -1,8 +1,6 @@
--- Drop and recreate tables
+-- Drop and recreate farm_fields. Everything else is kept across runs:
+-- NDVI imports, weather and USDA are incremental (see backfill.py)
 DROP TABLE IF EXISTS farm_fields;
-DROP TABLE IF EXISTS sentinel_ndvi;
-DROP TABLE IF EXISTS weather_daily;
-DROP TABLE IF EXISTS usda_yield;
 
 -- Farm fields
 CREATE TABLE farm_fields (
@@ -11,7 +9,7 @@ CREATE TABLE farm_fields (
 );
 
 -- NDVI
-CREATE TABLE sentinel_ndvi (
+CREATE TABLE IF NOT EXISTS sentinel_ndvi (
     field_id TEXT,
     date DATE,
     ndvi_mean REAL,
@@ -19,9 +17,21 @@ CREATE TABLE sentinel_ndvi (
     cloud_cover REAL DEFAULT 0,
     FOREIGN KEY (field_id) REFERENCES farm_fields(field_id)
 );
+-- One row per field per date: imports dedupe with INSERT OR IGNORE
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ndvi_field_date ON sentinel_ndvi (field_id, date);
+
+-- NDVI import checkpoints (pipeline/import_ndvi.py)
+CREATE TABLE IF NOT EXISTS ndvi_imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    rows_done INTEGER DEFAULT 0,
+    rows_inserted INTEGER DEFAULT 0,
+    completed INTEGER DEFAULT 0
+);
 
 -- Weather: ALL COLUMNS OPTIONAL (safe for partial data)
-CREATE TABLE weather_daily (
+CREATE TABLE IF NOT EXISTS weather_daily (
     date DATE PRIMARY KEY,
     tmax REAL,
     tmin REAL,
@@ -30,8 +40,40 @@ CREATE TABLE weather_daily (
 );
 
 -- USDA
-CREATE TABLE usda_yield (
+CREATE TABLE IF NOT EXISTS usda_yield (
     year INTEGER,
     commodity TEXT,
     yield_bu_acre REAL
-);
\ No newline at end of file
+);
+
+-- Backfill checkpoints: per (source, unit), the settled date range already fetched
+-- (days older than the source's reporting lag when fetched; see backfill.py)
+CREATE TABLE IF NOT EXISTS backfill_units (
+    source TEXT,
+    unit TEXT,
+    start_date DATE,
+    end_date DATE,
+    rows INTEGER,
+    completed_at TEXT,
+    PRIMARY KEY (source, unit)
+);
+
+-- Forecasts (pipeline/forecast.py): 'ndvi' per field, 'gdd_cum' per farm
+CREATE TABLE IF NOT EXISTS forecasts (
+    series_type TEXT,
+    series_id TEXT,
+    date DATE,
+    yhat REAL,
+    yhat_lower REAL,
+    yhat_upper REAL,
+    PRIMARY KEY (series_type, series_id, date)
+);
+
+-- Fit cache: a series is only refit when its data hash changes
+CREATE TABLE IF NOT EXISTS forecast_fits (
+    series_type TEXT,
+    series_id TEXT,
+    data_hash TEXT,
+    fitted_at TEXT,
+    PRIMARY KEY (series_type, series_id)
+);
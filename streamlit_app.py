@@ -1,97 +1,153 @@
 import streamlit as st
-import sqlite3
+import os
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import geopandas as gpd
-from pipeline import train_yield_model, load_config, get_benchmarks
+from pipeline import load_config
+from pipeline.ingest_noaa import mock_weather
+from pipeline.snapshots import db_version, connect_readonly
+from pipeline.reports import FARM_REPORT_ID, NDVI_ALERT, ndvi_recommendation, weather_recommendation
 from twilio.rest import Client
 
 config = load_config()
-yield_df, hist = train_yield_model()
 
 st.set_page_config(page_title="Smart Farm", layout="wide")
 st.title("Smart Farm Yield Intelligence Hub")
 
-# Load data
-@st.cache_data
-def load_data():
-    conn = sqlite3.connect("data/weekly_pipeline.db")
-    ndvi = pd.read_sql("SELECT field_id, date, ndvi_mean FROM sentinel_ndvi", conn)
-    weather = pd.read_sql("SELECT date, tmax, tmin, prcp, gdd FROM weather_daily", conn)
-    fields = pd.read_sql("SELECT field_id, crop_2025 FROM farm_fields", conn)
-    conn.close()
-    ndvi['date'] = pd.to_datetime(ndvi['date'])
-    weather['date'] = pd.to_datetime(weather['date'])
-    return ndvi, weather, fields
+# Cache is keyed on the published snapshot: a new pipeline run = fresh data
+version = db_version()
 
-ndvi, weather, fields = load_data()
+# The pipeline precomputes small mv_* tables (pipeline/dashboard_views.py);
+# the dashboard only reads those, filtered to the selected field in SQL.
+# Each loader reads through one connection: a snapshot published mid-load
+# replaces the file, but an open connection keeps reading the old one.
+def query(conn, sql, params=(), parse_dates=None):
+    return pd.read_sql(sql, conn, params=params, parse_dates=parse_dates)
 
-# Yield forecast
-yield_df, hist = train_yield_model()
+@st.cache_data
+def load_farm(version):
+    conn = connect_readonly()
+    try:
+        return _load_farm(conn)
+    finally:
+        conn.close()
+
+def _load_farm(conn):
+    latest_ndvi = query(conn, "SELECT field_id, date, ndvi_mean FROM mv_latest_ndvi ORDER BY field_id",
+                        parse_dates=['date'])
+    yield_df = query(conn, "SELECT field_id, yield_pred, hist_yield FROM mv_yield_predictions")
+    weather = query(conn, "SELECT week_start, tmax, tmin, prcp, gdd FROM mv_weather_weekly ORDER BY week_start",
+                    parse_dates=['week_start'])
+    latest_weather = query(conn, "SELECT date, prcp, gdd FROM mv_weather_latest")
+    gdd_forecast = query(conn, """SELECT date, yhat, yhat_lower, yhat_upper FROM forecasts
+                            WHERE series_type = 'gdd_cum' ORDER BY date DESC LIMIT 1""")
+    return latest_ndvi, yield_df, weather, latest_weather, gdd_forecast
+
+@st.cache_data
+def load_field(version, field_id):
+    conn = connect_readonly()
+    try:
+        return _load_field(conn, field_id)
+    finally:
+        conn.close()
+
+def _load_field(conn, field_id):
+    series = query(conn, "SELECT date, ndvi_mean FROM mv_ndvi_series WHERE field_id = ? ORDER BY date",
+                   params=(field_id,), parse_dates=['date'])
+    bench = query(conn, "SELECT * FROM mv_benchmarks WHERE field_id = ?", params=(field_id,))
+    forecast = query(conn, """SELECT date, yhat, yhat_lower, yhat_upper FROM forecasts
+                        WHERE series_type = 'ndvi' AND series_id = ? ORDER BY date""",
+                     params=(field_id,), parse_dates=['date'])
+    return series, bench, forecast
 
-# Historical Comparison + Yield Benchmarking
 try:
-    hist_ndvi, county_avg = get_benchmarks()
-    current_ndvi = latest_ndvi['ndvi_mean'].iloc[-1]
-    st.metric("vs. 2024 NDVI", f"{current_ndvi:.2f}", f"{current_ndvi - hist_ndvi:+.2f}")
-    st.metric("vs. County Avg", f"{pred:.1f} bu/acre", f"{pred - county_avg:+.1f}")
-except Exception as e:
-    st.warning("Benchmarks unavailable (DB empty)")
+    latest_ndvi, yield_df, weather, latest_weather, gdd_forecast = load_farm(version)
+except pd.errors.DatabaseError:
+    st.error("Dashboard views not built yet: run the pipeline (python main.py)")
+    st.stop()
+hist = yield_df['hist_yield'].iloc[0] if not yield_df.empty else float('nan')
 
 # Sidebar
 st.sidebar.header("Field Selector")
-field_ids = ndvi['field_id'].unique()
+field_ids = latest_ndvi['field_id'].tolist()
 selected_field = st.sidebar.selectbox("Choose Field", field_ids)
 
+field_ndvi, bench, field_forecast = load_field(version, selected_field)
+field_yield = yield_df[yield_df['field_id'] == selected_field]
+pred = field_yield['yield_pred'].iloc[0] if not field_yield.empty else float('nan')
+
+# Historical Comparison + Yield Benchmarking
+if not bench.empty:
+    b = bench.iloc[0]
+    st.metric("vs. 2024 NDVI", f"{b['ndvi_mean']:.2f}", f"{b['ndvi_delta']:+.2f}")
+    st.metric("vs. County Avg", f"{b['yield_pred']:.1f} bu/acre", f"{b['yield_delta']:+.1f}")
+else:
+    st.warning("Benchmarks unavailable (DB empty)")
+
 # Main
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("NDVI Trend")
-    field_ndvi = ndvi[ndvi['field_id'] == selected_field]
     fig1 = px.line(field_ndvi, x='date', y='ndvi_mean', title=f"NDVI - {selected_field}")
+    if not field_forecast.empty:
+        fig1.add_trace(go.Scatter(x=field_forecast['date'], y=field_forecast['yhat_upper'],
+                                  line=dict(width=0), showlegend=False))
+        fig1.add_trace(go.Scatter(x=field_forecast['date'], y=field_forecast['yhat_lower'],
+                                  fill='tonexty', line=dict(width=0), name='95% interval'))
+        fig1.add_trace(go.Scatter(x=field_forecast['date'], y=field_forecast['yhat'],
+                                  line=dict(dash='dot'), name='Forecast'))
     fig1.add_hline(y=0.7, line_dash="dash", line_color="orange")
     st.plotly_chart(fig1, use_container_width=True)
 
     # Yield
-    pred = yield_df[yield_df['field_id'] == selected_field]['yield_pred'].iloc[0]
     st.metric("2026 Yield Forecast", f"{pred} bu/acre", f"+{pred-hist:.1f} vs avg")
 
 with col2:
-    st.subheader("Weather & GDD")
+    st.subheader("Weather & GDD (weekly)")
+    if weather.empty:
+        # Display only: sample weather is never written to weather_daily
+        st.caption("No NOAA data yet: showing sample weather")
+        weather = mock_weather()
+        weather['week_start'] = weather['date'].dt.to_period('W-SUN').dt.start_time
+        weather = weather.groupby('week_start', as_index=False)[['gdd', 'prcp']].sum()
     fig2 = go.Figure()
-    fig2.add_trace(go.Scatter(x=weather['date'], y=weather['gdd'], name='GDD', fill='tozeroy'))
-    fig2.add_trace(go.Scatter(x=weather['date'], y=weather['prcp']*10, name='PRCP (x10)', yaxis='y2'))
+    fig2.add_trace(go.Scatter(x=weather['week_start'], y=weather['gdd'], name='GDD', fill='tozeroy'))
+    fig2.add_trace(go.Scatter(x=weather['week_start'], y=weather['prcp']*10, name='PRCP (x10)', yaxis='y2'))
     fig2.update_layout(yaxis2=dict(title="PRCP (in)", overlaying='y', side='right'))
     st.plotly_chart(fig2, use_container_width=True)
+    if not gdd_forecast.empty:
+        g = gdd_forecast.iloc[0]
+        st.metric(f"Season GDD by {g['date']}", f"{g['yhat']:.0f}",
+                  f"{g['yhat_lower']:.0f}–{g['yhat_upper']:.0f} (95%)", delta_color="off")
 
 # Map
 st.subheader("Farm Map")
 import geopandas as gpd
 gdf = gpd.read_file("data/raw/fields.geojson")
-gdf = gdf.merge(yield_df, on='field_id')
+gdf = gdf.merge(yield_df[['field_id', 'yield_pred']], on='field_id')
 fig = px.choropleth_mapbox(gdf, geojson=gdf.geometry, locations=gdf.index, color='yield_pred',
                            mapbox_style="carto-positron", zoom=12, center={"lat": 40.49, "lon": -88.99},
                            color_continuous_scale="YlGn", title="Yield Forecast")
 st.plotly_chart(fig, use_container_width=True)
 
 # Alerts
-latest_ndvi = ndvi.sort_values('date').groupby('field_id').tail(1)
-drops = latest_ndvi[latest_ndvi['ndvi_mean'] < 0.6]
+drops = latest_ndvi[latest_ndvi['ndvi_mean'] < NDVI_ALERT]
 if not drops.empty:
-    st.error(f"ALERT: {len(drops)} fields below NDVI 0.6!")
+    st.error(f"ALERT: {len(drops)} fields below NDVI {NDVI_ALERT}!")
 
 st.subheader("Recommendations")
 if not drops.empty:
     for _, drop in drops.iterrows():
-        rec = "Scout for pests" if drop['ndvi_mean'] < 0.5 else "Check irrigation"
+        rec = ndvi_recommendation(drop['ndvi_mean'])
         st.warning(f"Field {drop['field_id']}: {rec} (NDVI: {drop['ndvi_mean']:.2f})")
 
 # Weather-based recs
-latest_weather = weather.tail(1)
-if latest_weather['prcp'].iloc[0] < 0.1 and latest_weather['gdd'].iloc[0] > 20:
-    st.info("Hot & dry: Schedule irrigation for all fields")
+if not latest_weather.empty:
+    weather_rec = weather_recommendation(latest_weather['prcp'].iloc[0], latest_weather['gdd'].iloc[0])
+    if weather_rec:
+        st.info(weather_rec)
 
 # Add SMS Alerts
 #if st.button("Send SMS Alert"):
@@ -103,15 +159,29 @@ if latest_weather['prcp'].iloc[0] < 0.1 and latest_weather['gdd'].iloc[0] > 20:
 #    )
 #   st.success("SMS Sent!")
 
-if st.button("Generate Weekly Report"):
-    # PDF export (using reportlab)
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    c = canvas.Canvas("weekly_report.pdf", pagesize=letter)
-    c.drawString(100, 750, f"Smart Farm Report - {datetime.now().date()}")
-    c.drawString(100, 700, f"F1 Yield: {pred} bu/acre")
-    c.save()
-    st.download_button("Download PDF", data=open("weekly_report.pdf", "rb"), file_name="weekly_report.pdf")
+# Weekly reports are prebuilt by the pipeline (pipeline/reports.py); just serve them
+@st.cache_data
+def load_report(version, kind, report_id):
+    conn = connect_readonly()
+    try:
+        row = query(conn, "SELECT as_of, path FROM reports WHERE kind = ? AND report_id = ?",
+                    params=(kind, report_id))
+    finally:
+        conn.close()
+    if row.empty or not os.path.exists(row['path'].iloc[0]):
+        return None, None
+    with open(row['path'].iloc[0], "rb") as f:
+        return row['as_of'].iloc[0], f.read()
+
+st.subheader("Weekly Reports")
+for label, kind, report_id in [(f"Field {selected_field}", 'field', selected_field),
+                               ("Whole farm", 'farm', FARM_REPORT_ID)]:
+    as_of, pdf = load_report(version, kind, report_id)
+    if pdf is None:
+        st.caption(f"{label}: report not built yet (runs with the weekly pipeline)")
+    else:
+        st.download_button(f"Download {label} report", data=pdf, mime="application/pdf",
+                           file_name=f"weekly_report_{kind}_{report_id}_{as_of}.pdf")
 
 # CSV Export
-st.download_button("Export Data", data=yield_df.to_csv(), file_name="yields.csv")
\ No newline at end of file
+st.download_button("Export Data", data=yield_df[['field_id', 'yield_pred']].to_csv(), file_name="yields.csv")
\ No newline at end of file